@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import random
+import string
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+from tasks import run_bash_script
+
+KEYWORDS_FILE = "./urlsevplat.txt"
+RESULTS_DIR = "bench_results"
+FILLER_DOMAINS = ["gmail.com", "yahoo.com", "example.org", "shop.example.net", "mail.ru", "outlook.com"]
+# Keywords match anywhere in a line, case-insensitively, so hits are not all clean https://{domain}/ URLs.
+URL_FORMS = ["https://{}/login", "http://www.{}/", "https://my{}/auth", "android://{}.cdn.example.net/", "{}"]
+
+
+class BulkStub:
+    """Local stand-in for OpenSearch that accepts ``/_bulk`` and counts what it receives."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.docs = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests += 1
+                stub.bytes += len(body)
+                stub.docs += body.count(b'\n') // 2
+                response = b'{"took":0,"errors":false,"items":[]}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def random_token(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choices(string.ascii_lowercase + string.digits, k=length))
+
+
+def generate_corpus(path: Path, size_mb: float, hit_rate: float, seed: int) -> Dict[str, int]:
+    with open(KEYWORDS_FILE, 'r', encoding='utf-8') as f:
+        keywords = [line.strip() for line in f if line.strip()]
+
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    lines = 0
+    hits = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            if rng.random() < hit_rate:
+                domain = rng.choice(keywords)
+                domain = domain.upper() if rng.random() < 0.2 else domain
+                url = rng.choice(URL_FORMS).format(domain)
+                hits += 1
+            else:
+                url = f"https://{rng.choice(FILLER_DOMAINS)}/login"
+            user = f"{random_token(rng, 8)}@{rng.choice(FILLER_DOMAINS)}"
+            line = f"{url}:{user}:{random_token(rng, 12)}\n"
+            f.write(line)
+            written += len(line)
+            lines += 1
+    return {'bytes': written, 'lines': lines, 'hits': hits}
+
+
+def run_bash_engine(corpus: Path) -> Dict[str, Any]:
+    result = run_bash_script(str(corpus))
+    if result['status'] != 'success':
+        raise RuntimeError(f"parse script failed: {result['stderr'] or result['stdout']}")
+    return {'peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024}
+
+
+def run_stream_engine(corpus: Path, chunk_size: int = 128 * 1024) -> Dict[str, Any]:
+    import aiohttp
+    import stream_parse
+    from dedup import LineDedup
+
+    stream_parse.OPENSEARCH_URL = os.environ['OPENSEARCH_URL']
+
+    async def run():
+        dedup = LineDedup(os.environ['DEDUP_DIR'])
+        try:
+            async with aiohttp.ClientSession() as session:
+                matcher = stream_parse.StreamMatcher(str(corpus), stream_parse.load_keywords(KEYWORDS_FILE),
+                                                     session, dedup)
+                with open(corpus, 'rb') as f:
+                    while chunk := f.read(chunk_size):
+                        await matcher.feed(chunk)
+                await matcher.close()
+        finally:
+            dedup.close()
+
+    asyncio.run(run())
+    return {'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+ENGINES = {'bash': run_bash_engine, 'stream': run_stream_engine}
+
+
+def run_engine(engine: str, corpus: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    stats = ENGINES[engine](Path(corpus))
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def benchmark(engine: str, size_mb: float, hit_rate: float, seed: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix='tgbench-') as tmp:
+        corpus = Path(tmp) / 'combolist.txt'
+        corpus_stats = generate_corpus(corpus, size_mb, hit_rate, seed)
+
+        with BulkStub() as stub:
+            os.environ['OPENSEARCH_URL'] = stub.url
+            os.environ['DEDUP_DIR'] = str(Path(tmp) / 'dedup')
+            os.environ['OUTFILE'] = str(Path(tmp) / 'payload.ndjson')
+            os.environ.setdefault('PYTHON', sys.executable)
+
+            # A fresh interpreter per run, so ru_maxrss is this engine's peak alone.
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                engine_stats = pool.submit(run_engine, engine, str(corpus)).result()
+            elapsed = engine_stats['seconds']
+
+        mb = corpus_stats['bytes'] / (1024 * 1024)
+        return {
+            'engine': engine,
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'size_mb': round(mb, 2),
+            'hit_rate': hit_rate,
+            'seed': seed,
+            'lines': corpus_stats['lines'],
+            'expected_matches': corpus_stats['hits'],
+            'matches': stub.docs,
+            'bulk_requests': stub.requests,
+            'bulk_bytes': stub.bytes,
+            'seconds': round(elapsed, 3),
+            'mb_per_s': round(mb / elapsed, 3),
+            'lines_per_s': round(corpus_stats['lines'] / elapsed, 1),
+            'matches_per_s': round(stub.docs / elapsed, 1),
+            'peak_rss_mb': round(engine_stats['peak_rss_mb'], 1),
+        }
+
+
+def previous_result(results_dir: Path, run: Dict[str, Any]) -> Dict[str, Any]:
+    keys = ('engine', 'size_mb', 'hit_rate', 'seed')
+    for path in sorted(results_dir.glob('*.json'), reverse=True):
+        try:
+            with open(path, 'r') as f:
+                old = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if all(old.get(key) == run[key] for key in keys):
+            return old
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parse and upload pipeline against a local /_bulk stub.")
+    parser.add_argument('--engine', choices=sorted(ENGINES) + ['all'], default='all')
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--hit-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    results_dir = Path(args.output_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    engines: List[str] = sorted(ENGINES) if args.engine == 'all' else [args.engine]
+
+    for engine in engines:
+        print(f"⏱️  Benchmarking {engine} engine ({args.size_mb} MB, hit rate {args.hit_rate})...")
+        run = benchmark(engine, args.size_mb, args.hit_rate, args.seed)
+        previous = previous_result(results_dir, run)
+
+        print(f"   {run['mb_per_s']} MB/s, {run['lines_per_s']} lines/s, {run['matches_per_s']} matches/s, "
+              f"{run['bulk_requests']} bulk requests, peak RSS {run['peak_rss_mb']} MB")
+        if run['matches'] != run['expected_matches']:
+            print(f"   ⚠️  Indexed {run['matches']} lines, expected {run['expected_matches']}")
+        if previous:
+            change = (run['mb_per_s'] - previous['mb_per_s']) / previous['mb_per_s'] * 100
+            print(f"   vs {previous['commit']}: {previous['mb_per_s']} MB/s ({change:+.1f}%)")
+
+        out_file = results_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{run['commit']}-{engine}.json"
+        with open(out_file, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"   Saved {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import time
+import asyncio
+
+
+class AIMDLimiter:
+    """Download slot limiter with additive-increase / multiplicative-decrease control.
+
+    While throughput keeps rising over a window with no errors, one slot is added.
+    A FloodWaitError or timeout halves the limit (at most once per window, so a burst
+    of failures from tasks already in flight counts as one signal), and a FloodWait
+    also pauses every task, not just the one that received it.
+    """
+
+    def __init__(self, initial: int = 5, min_limit: int = 1, max_limit: int = 20,
+                 increase: float = 1, decrease: float = 0.5, window: float = 10.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+        self.reset_window(time.monotonic())
+        self.last_rate = None
+
+    def reset_window(self, now: float):
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_errors = 0
+
+    async def __aenter__(self):
+        async with self.condition:
+            while True:
+                delay = self.paused_until - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    break
+                await self.condition.wait()
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def wait_if_paused(self):
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self, nbytes: int):
+        self.window_bytes += nbytes
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+
+        rate = self.window_bytes / elapsed
+        if self.window_errors == 0 and self.limit < self.max_limit and (self.last_rate is None or rate > self.last_rate):
+            self.set_limit(min(self.max_limit, self.limit + self.increase),
+                           f"throughput up to {rate / (1024 * 1024):.2f} MB/s, no errors")
+        self.last_rate = rate
+        self.reset_window(now)
+
+    def record_flood_wait(self, seconds: int):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.record_error(f"FloodWait {seconds}s, pausing all downloads")
+
+    def record_timeout(self):
+        self.record_error("download timed out")
+
+    def record_error(self, reason: str):
+        now = time.monotonic()
+        self.window_errors += 1
+        if now - self.last_decrease < self.window:
+            return
+        self.last_decrease = now
+        self.last_rate = None
+        self.set_limit(max(self.min_limit, self.limit * self.decrease), reason)
+
+    def set_limit(self, limit: float, reason: str):
+        old = int(self.limit)
+        self.limit = limit
+        if int(limit) != old:
+            print(f"\n⚙️  Download concurrency {old} → {int(limit)} ({reason})")
+        try:
+            asyncio.get_running_loop().create_task(self.wake())
+        except RuntimeError:
+            pass
+
+    async def wake(self):
+        async with self.condition:
+            self.condition.notify_all()
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import math
+import mmap
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_DEDUP_DIR = os.getenv("DEDUP_DIR", "./dedup")
+DEFAULT_CAPACITY = 20_000_000
+DEFAULT_ERROR_RATE = 0.01
+CHUNK_SIZE = 1000
+
+
+class LineDedup:
+    """Persistent set of line hashes shared by every parse job.
+
+    A Bloom filter (mmap'd file) sits in front of an exact SQLite store. Lines the
+    filter has never seen go straight to ``INSERT OR IGNORE``; lines it might have
+    seen are checked with a read-only lookup, so re-shared lines never take the
+    write lock. The SQLite store is the only authority. A bit lost to two processes
+    updating the same filter byte at once (or to a crash between commit and the
+    mmap write) lets that line through one more filter pass; recording it again
+    restores the bits, since every recorded line is re-added to the filter.
+
+    Jobs filter with ``record=False`` and call ``record`` once the bulk upload has
+    succeeded, so a failed upload never marks its lines as indexed. One instance
+    may be shared by worker threads; chunks are serialized on ``lock``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DEDUP_DIR, capacity: int = DEFAULT_CAPACITY,
+                 error_rate: float = DEFAULT_ERROR_RATE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.directory / 'lines.db'), timeout=60, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS lines (hash BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('bloom_bits', ?)",
+                          (str(self.optimal_bits(capacity, error_rate)),))
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('bloom_hashes', ?)",
+                          (str(self.optimal_hashes(capacity, error_rate)),))
+        self.conn.commit()
+
+        # The first job to create the store fixes the filter geometry for everyone.
+        meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+        self.num_bits = int(meta['bloom_bits'])
+        self.num_hashes = int(meta['bloom_hashes'])
+
+        bloom_file = self.directory / 'lines.bloom'
+        size = (self.num_bits + 7) // 8
+        with open(bloom_file, 'a+b') as f:
+            if os.path.getsize(bloom_file) < size:
+                f.truncate(size)
+        self.bloom_fd = os.open(str(bloom_file), os.O_RDWR)
+        self.bloom = mmap.mmap(self.bloom_fd, size)
+
+        self.stats = {'seen': 0, 'new': 0, 'known': 0}
+
+    @staticmethod
+    def optimal_bits(capacity: int, error_rate: float) -> int:
+        return int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+    @staticmethod
+    def optimal_hashes(capacity: int, error_rate: float) -> int:
+        bits = LineDedup.optimal_bits(capacity, error_rate)
+        return max(1, int(round(bits / capacity * math.log(2))))
+
+    @staticmethod
+    def hash_line(line: bytes) -> bytes:
+        return hashlib.blake2b(line.rstrip(b'\r\n'), digest_size=16).digest()
+
+    def bit_positions(self, digest: bytes) -> Iterator[int]:
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def might_contain(self, digest: bytes) -> bool:
+        bloom = self.bloom
+        return all(bloom[pos >> 3] & (1 << (pos & 7)) for pos in self.bit_positions(digest))
+
+    def add_to_bloom(self, digest: bytes):
+        bloom = self.bloom
+        for pos in self.bit_positions(digest):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+
+    def filter_chunk(self, lines: List[bytes], record: bool = True, pending: Optional[Set[bytes]] = None) -> List[bytes]:
+        with self.lock:
+            hashed: List[Tuple[bytes, bytes]] = [(line, self.hash_line(line)) for line in lines]
+            self.stats['seen'] += len(hashed)
+
+            maybe_seen = [digest for _, digest in hashed if self.might_contain(digest)]
+            known = set()
+            if maybe_seen:
+                placeholders = ','.join('?' * len(maybe_seen))
+                known = {row[0] for row in self.conn.execute(
+                    f'SELECT hash FROM lines WHERE hash IN ({placeholders})', maybe_seen)}
+
+            candidates = [(line, digest) for line, digest in hashed if digest not in known]
+            self.stats['known'] += len(hashed) - len(candidates)
+            if not candidates:
+                return []
+
+            if not record:
+                if pending is None:
+                    pending = set()
+                fresh = []
+                for line, digest in candidates:
+                    if digest not in pending:
+                        pending.add(digest)
+                        fresh.append(line)
+                self.stats['new'] += len(fresh)
+                return fresh
+
+            fresh = []
+            with self.conn:
+                for line, digest in candidates:
+                    if self.conn.execute('INSERT OR IGNORE INTO lines (hash) VALUES (?)', (digest,)).rowcount:
+                        fresh.append((line, digest))
+
+            # Includes hashes SQLite already had, to repair bits lost to a race or crash.
+            for _, digest in candidates:
+                self.add_to_bloom(digest)
+
+            self.stats['new'] += len(fresh)
+            return [line for line, _ in fresh]
+
+    def filter(self, lines: Iterable[bytes], record: bool = True) -> Iterator[bytes]:
+        pending: Set[bytes] = set()
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= CHUNK_SIZE:
+                yield from self.filter_chunk(chunk, record, pending)
+                chunk = []
+        if chunk:
+            yield from self.filter_chunk(chunk, record, pending)
+
+    def record(self, lines: Iterable[bytes]):
+        for _ in self.filter(lines, record=True):
+            pass
+
+    def close(self):
+        self.bloom.flush()
+        self.bloom.close()
+        os.close(self.bloom_fd)
+        self.conn.close()
+
+
+def bulk_accepted(response: dict) -> List[bool]:
+    """Per-document outcome of an OpenSearch ``_bulk`` response, in request order.
+
+    ``_bulk`` answers HTTP 200 even when some items were rejected, so callers
+    must only record the lines whose item succeeded.
+    """
+    return [200 <= next(iter(item.values()), {}).get('status', 500) < 300
+            for item in response.get('items', [])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop lines that were already indexed (stdin -> stdout).")
+    parser.add_argument('--dir', default=DEFAULT_DEDUP_DIR, help="Shared dedup store directory")
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help="Expected number of unique lines")
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_ERROR_RATE, help="Bloom filter false positive rate")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--no-record', action='store_true', help="Only filter; record later with --record-only")
+    mode.add_argument('--record-only', action='store_true', help="Mark stdin lines as indexed without output")
+    parser.add_argument('--bulk-response', help="With --record-only, only record lines this _bulk response accepted")
+    args = parser.parse_args()
+
+    dedup = LineDedup(args.dir, args.capacity, args.error_rate)
+    out = sys.stdout.buffer
+    try:
+        if args.record_only and args.bulk_response:
+            with open(args.bulk_response, 'r', encoding='utf-8') as f:
+                response = json.load(f)
+            lines = sys.stdin.buffer.read().split(b'\n')
+            if lines and not lines[-1]:
+                lines.pop()
+            accepted = bulk_accepted(response) if response.get('errors') else [True] * len(lines)
+            if len(accepted) != len(lines):
+                print(f"Dedup: response has {len(accepted)} items for {len(lines)} lines, not recording",
+                      file=sys.stderr)
+                return
+            dedup.record(line for line, ok in zip(lines, accepted) if ok)
+        elif args.record_only:
+            dedup.record(sys.stdin.buffer)
+        else:
+            for line in dedup.filter(sys.stdin.buffer, record=not args.no_record):
+                out.write(line if line.endswith(b'\n') else line + b'\n')
+            out.flush()
+    finally:
+        dedup.close()
+        if not args.record_only:
+            print(f"Dedup: {dedup.stats['new']} new / {dedup.stats['seen']} lines", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,16 @@
 #!/bin/bash
 
-OPENSEARCH_URL="http://localhost:9200"
-INDEX="databreach"
+OPENSEARCH_URL="${OPENSEARCH_URL:-http://localhost:9200}"
+INDEX="${OPENSEARCH_INDEX:-databreach}"
 
 INPUT_FILE="$1"
 shift
 
 UPLOAD=true
+DEDUP=true
 KEYWORDS=()
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PYTHON="${PYTHON:-python3}"
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
@@ -15,6 +18,10 @@ while [[ $# -gt 0 ]]; do
       UPLOAD=true
       shift
       ;;
+    --no-dedup)
+      DEDUP=false
+      shift
+      ;;
     --keywords-file)
       if [[ -f "$2" ]]; then
         while IFS= read -r kw; do
@@ -34,7 +41,7 @@ while [[ $# -gt 0 ]]; do
 done
 
 if [[ -z "$INPUT_FILE" || ${#KEYWORDS[@]} -eq 0 ]]; then
-  echo "Usage: $0 <input_file> [keyword1 keyword2 ...] [--keywords-file file] [--upload]"
+  echo "Usage: $0 <input_file> [keyword1 keyword2 ...] [--keywords-file file] [--upload] [--no-dedup]"
   exit 1
 fi
 
@@ -43,12 +50,34 @@ PATTERN=$(IFS='|'; echo "${KEYWORDS[*]}")
 echo "Filtering file: $INPUT_FILE"
 echo "Keywords: ${KEYWORDS[*]}"
 echo "Mode: $([ "$UPLOAD" = true ] && echo 'UPLOAD' || echo 'DEBUG')"
+echo "Dedup: $([ "$DEDUP" = true ] && echo "ON (${DEDUP_DIR:-./dedup})" || echo 'OFF')"
 echo
 
-OUTFILE="payload.ndjson"
+OUTFILE="${OUTFILE:-payload.ndjson}"
 > "$OUTFILE"
 
-grep -a -i -E "$PATTERN" "$INPUT_FILE" | while IFS= read -r line; do
+NEWLINES=$(mktemp)
+RESPFILE=$(mktemp)
+trap 'rm -f "$NEWLINES" "$RESPFILE"' EXIT
+
+# Lines are only recorded as indexed after a successful upload (see below).
+dedup_filter() {
+  if [ "$DEDUP" = true ]; then
+    "$PYTHON" "$SCRIPT_DIR/dedup.py" --dir "${DEDUP_DIR:-./dedup}" --no-record
+  else
+    cat
+  fi
+}
+
+# Text dumps may be stored gzip-compressed; stream them without unpacking to disk.
+filter_input() {
+  case "$INPUT_FILE" in
+    *.gz) gzip -dc -- "$INPUT_FILE" | grep -a -i -E "$PATTERN" ;;
+    *) grep -a -i -E "$PATTERN" "$INPUT_FILE" ;;
+  esac
+}
+
+filter_input | dedup_filter | tee "$NEWLINES" | while IFS= read -r line; do
   safe_line=$(echo "$line" \
     | tr -d '\r' \
     | tr -d '\000-\010\013\014\016-\037' \
@@ -60,27 +89,42 @@ grep -a -i -E "$PATTERN" "$INPUT_FILE" | while IFS= read -r line; do
   echo "{ \"line\": \"$safe_line\", \"keyword\": \"$match\" }" >> "$OUTFILE"
 done
 
+if [ ! -s "$OUTFILE" ]; then
+  echo "No new lines to index"
+  exit 0
+fi
+
 if [ "$UPLOAD" = true ]; then
   echo "Uploading to OpenSearch..."
 
   if [ -n "$USER" ]; then
-    RESPONSE=$(curl -s -w "%{http_code}" -o /tmp/opensearch_resp.txt \
+    RESPONSE=$(curl -s -w "%{http_code}" -o "$RESPFILE" \
       -X POST "$OPENSEARCH_URL/_bulk" \
       -u "$USER:$PASS" \
       -H "Content-Type: application/x-ndjson" \
       --data-binary "@$OUTFILE")
   else
-    RESPONSE=$(curl -s -w "%{http_code}" -o /tmp/opensearch_resp.txt \
+    RESPONSE=$(curl -s -w "%{http_code}" -o "$RESPFILE" \
       -X POST "$OPENSEARCH_URL/_bulk" \
       -H "Content-Type: application/x-ndjson" \
       --data-binary "@$OUTFILE")
   fi
 
   if [ "$RESPONSE" = "200" ]; then
+    # _bulk returns 200 even when items are rejected; only accepted lines are recorded.
+    if [ "$DEDUP" = true ]; then
+      "$PYTHON" "$SCRIPT_DIR/dedup.py" --dir "${DEDUP_DIR:-./dedup}" --record-only \
+        --bulk-response "$RESPFILE" < "$NEWLINES"
+    fi
+    if grep -q '"errors" *: *true' "$RESPFILE"; then
+      echo "Upload partially failed: some documents were rejected"
+      exit 1
+    fi
     echo "Upload success"
   else
     echo "Upload failed (HTTP $RESPONSE)"
-    cat /tmp/opensearch_resp.txt
+    cat "$RESPFILE"
+    exit 1
   fi
 else
   echo "=== DEBUG NDJSON PAYLOAD (first 20 lines) ==="
@@ -0,0 +1,96 @@
+import os
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+MEDIA_FILES_SCHEMA = '''CREATE TABLE IF NOT EXISTS media_files
+                        (media_path TEXT PRIMARY KEY, message_id INTEGER, size INTEGER, checksum TEXT,
+                         downloaded_at TEXT, parsed_at TEXT, evicted_at TEXT)'''
+
+
+def ensure_media_files_table(conn: sqlite3.Connection):
+    created = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'media_files'").fetchone() is None
+    conn.execute(MEDIA_FILES_SCHEMA)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_media_files_message_id ON media_files(message_id)')
+    if created:
+        backfill_media_files(conn)
+    conn.commit()
+
+
+def backfill_media_files(conn: sqlite3.Connection):
+    """Register media downloaded before ``media_files`` existed.
+
+    They count toward the size budget, but nothing shows whether their parse job
+    ever ran (a failed enqueue or job left no trace), so ``parsed_at`` stays NULL
+    and they only become evictable once a parse job for them completes.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages'").fetchone() is None:
+        return
+
+    rows = conn.execute('SELECT message_id, media_path FROM messages WHERE media_path IS NOT NULL').fetchall()
+    for message_id, media_path in rows:
+        try:
+            stat = os.stat(media_path)
+        except OSError:
+            continue
+        conn.execute('''INSERT OR IGNORE INTO media_files (media_path, message_id, size, downloaded_at)
+                        VALUES (?, ?, ?, datetime(?, 'unixepoch'))''',
+                     (media_path, message_id, stat.st_size, int(stat.st_mtime)))
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def message_id_from_path(media_path: str) -> Optional[int]:
+    prefix = Path(media_path).name.split('-', 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def record_download(conn: sqlite3.Connection, media_path: str, message_id: int, size: int, checksum: str,
+                    downloaded_at: float):
+    """Upsert a finished download; ``downloaded_at`` is the file's mtime.
+
+    The parse job is queued only after the file is written, so a ``parsed_at``
+    older than the mtime belongs to a previous copy at the same path and is
+    cleared, while one the job set before this call is kept.
+    """
+    conn.execute('''INSERT INTO media_files (media_path, message_id, size, checksum, downloaded_at)
+                    VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))
+                    ON CONFLICT(media_path) DO UPDATE SET message_id = excluded.message_id, size = excluded.size,
+                        checksum = excluded.checksum, downloaded_at = excluded.downloaded_at, evicted_at = NULL,
+                        parsed_at = CASE WHEN parsed_at < excluded.downloaded_at THEN NULL ELSE parsed_at END''',
+                 (media_path, message_id, size, checksum, int(downloaded_at)))
+    conn.commit()
+
+
+def mark_parsed(conn: sqlite3.Connection, media_path: str):
+    # The parse job may finish before the scraper records the download, so upsert.
+    conn.execute('''INSERT INTO media_files (media_path, message_id, parsed_at) VALUES (?, ?, datetime('now'))
+                    ON CONFLICT(media_path) DO UPDATE SET parsed_at = excluded.parsed_at''',
+                 (media_path, message_id_from_path(media_path)))
+    conn.commit()
+
+
+def mark_parsed_file(file_path: str):
+    """Record parse completion from a worker process, which has no scraper state.
+
+    Media lives at ``<channel>/media/<message_id>-<name>``, so the channel database
+    is found relative to the file itself.
+    """
+    channel_dir = Path(file_path).parent.parent
+    db_file = channel_dir / f'{channel_dir.name}.db'
+    if not db_file.exists():
+        return
+
+    conn = sqlite3.connect(str(db_file), timeout=30)
+    try:
+        ensure_media_files_table(conn)
+        mark_parsed(conn, file_path)
+    finally:
+        conn.close()
@@ -0,0 +1,113 @@
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from concurrency import AIMDLimiter
+
+
+class PooledClient:
+    def __init__(self, name: str, client: Any, limiter: AIMDLimiter):
+        self.name = name
+        self.client = client
+        self.limiter = limiter
+        self.blocked_until = 0.0
+        self.unreachable: Set[str] = set()
+
+
+class SessionPool:
+    """Shards channels across several Telegram sessions.
+
+    Each channel has a stable home session (CRC32 of its ID), so the same account
+    keeps scraping and downloading it. A session that receives a FloodWait of at
+    least ``long_flood_wait`` seconds is benched until it expires, and its channels
+    fail over to the least loaded available session. Channels are stored as bare
+    IDs from the primary account's dialogs, so another account may not be able to
+    resolve them; the caller reports that with ``mark_unreachable`` and the channel
+    is only ever assigned to sessions that have not failed it. The pool only stores
+    client objects and never calls them, so scheduling can be exercised with fakes
+    and a fake ``clock``.
+    """
+
+    def __init__(self, long_flood_wait: int = 60, clock: Callable[[], float] = time.monotonic,
+                 limiter_factory: Callable[[], AIMDLimiter] = AIMDLimiter):
+        self.long_flood_wait = long_flood_wait
+        self.clock = clock
+        self.limiter_factory = limiter_factory
+        self.members: List[PooledClient] = []
+        self.assignments: Dict[str, PooledClient] = {}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def add(self, name: str, client: Any) -> PooledClient:
+        member = PooledClient(name, client, self.limiter_factory())
+        self.members.append(member)
+        return member
+
+    def clients(self) -> List[Any]:
+        return [member.client for member in self.members]
+
+    def available(self, channel: Optional[str] = None) -> List[PooledClient]:
+        now = self.clock()
+        return [member for member in self.members
+                if member.blocked_until <= now and channel not in member.unreachable]
+
+    def load(self, member: PooledClient) -> int:
+        return sum(1 for assigned in self.assignments.values() if assigned is member)
+
+    def member_for(self, channel: str) -> PooledClient:
+        if not self.members:
+            raise RuntimeError("Session pool is empty")
+
+        reachable = [member for member in self.members if channel not in member.unreachable]
+        if not reachable:
+            raise RuntimeError(f"No session can access channel {channel}")
+
+        current = self.assignments.get(channel)
+        if current in reachable and current.blocked_until <= self.clock():
+            return current
+
+        # With every session benched, wait on the one that frees up first.
+        candidates = self.available(channel) or [min(reachable, key=lambda m: m.blocked_until)]
+        home = self.members[zlib.crc32(channel.encode()) % len(self.members)]
+        choice = home if home in candidates else min(candidates, key=lambda m: (self.load(m), self.members.index(m)))
+
+        if current and choice is not current:
+            print(f"\n🔀 Channel {channel} moved from session {current.name} to {choice.name}")
+        self.assignments[channel] = choice
+        return choice
+
+    def client_for(self, channel: str) -> Any:
+        return self.member_for(channel).client
+
+    def member_of(self, client: Any) -> Optional[PooledClient]:
+        for member in self.members:
+            if member.client is client:
+                return member
+        return None
+
+    def mark_unreachable(self, member: PooledClient, channel: str):
+        member.unreachable.add(channel)
+        if self.assignments.get(channel) is member:
+            del self.assignments[channel]
+        print(f"\n🚫 Session {member.name} cannot access channel {channel}")
+
+    def report_flood_wait(self, client: Any, seconds: int, channel: Optional[str] = None) -> bool:
+        member = self.member_of(client)
+        if member is None:
+            return False
+
+        member.limiter.record_flood_wait(seconds)
+        if seconds < self.long_flood_wait:
+            return False
+
+        member.blocked_until = max(member.blocked_until, self.clock() + seconds)
+        print(f"\n⏸️  Session {member.name} benched for {seconds}s after FloodWait")
+        # Failing over only helps when another session can take the work right now.
+        return bool(self.available(channel))
+
+    def shard(self, channels: List[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for channel in channels:
+            groups.setdefault(self.member_for(channel).name, []).append(channel)
+        return groups
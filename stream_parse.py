@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple, Union
+
+import aiohttp
+
+from dedup import LineDedup, bulk_accepted
+
+OPENSEARCH_URL = os.getenv("OPENSEARCH_URL", "http://localhost:9200")
+OPENSEARCH_INDEX = os.getenv("OPENSEARCH_INDEX", "databreach")
+KEYWORDS_FILE = "./urlsevplat.txt"
+BULK_MAX_DOCS = 5000
+BULK_FLUSH_SECONDS = 5.0
+
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\r]')
+
+
+def load_keywords(path: str = KEYWORDS_FILE) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class KeywordMatcher:
+    """Finds the lines ``grep -a -i -E 'kw1|kw2|...'`` would select, over whole chunks.
+
+    Keywords are folded into a trie so each position tries one branch per
+    character instead of every alternative, and the pattern runs case-sensitively
+    over a lowercased copy of the chunk rather than with ``re.IGNORECASE``. As in
+    parse.sh, a keyword matches anywhere in a line and ``.`` matches any character.
+    """
+
+    def __init__(self, keywords: List[str]):
+        trie: Dict[str, dict] = {}
+        for keyword in keywords:
+            node = trie
+            for ch in keyword.lower():
+                node = node.setdefault(ch, {})
+            node[''] = {}
+        self.pattern = re.compile(self.trie_pattern(trie).encode())
+
+    @classmethod
+    def trie_pattern(cls, node: Dict[str, dict]) -> str:
+        branches = [('.' if ch == '.' else re.escape(ch)) + cls.trie_pattern(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        # A keyword ends here, but a longer one continues: the rest is optional.
+        return group + '?' if '' in node else group
+
+    def find_lines(self, data: bytes) -> List[Tuple[bytes, bytes]]:
+        """Return ``(line, matched text)`` for every matching line in ``data``."""
+        lowered = data.lower()
+        hits = []
+        pos = 0
+        while match := self.pattern.search(lowered, pos):
+            start = data.rfind(b'\n', 0, match.start()) + 1
+            end = data.find(b'\n', match.end())
+            if end < 0:
+                end = len(data)
+            hits.append((data[start:end], data[match.start():match.end()]))
+            pos = end + 1
+        return hits
+
+
+class StreamMatcher:
+    """In-process equivalent of parse.sh that is fed download chunks as they arrive.
+
+    Complete lines are matched with ``KeywordMatcher`` and filtered through the
+    shared dedup store in a worker thread, so the event loop keeps serving other
+    downloads. Matches are shipped to ``/_bulk`` every ``BULK_MAX_DOCS`` lines or
+    ``BULK_FLUSH_SECONDS``, whichever comes first, instead of after the whole file
+    has landed on disk.
+    """
+
+    def __init__(self, source: str, keywords: Union[List[str], KeywordMatcher], session: aiohttp.ClientSession,
+                 dedup: Optional[LineDedup] = None):
+        self.source = source
+        self.keywords = keywords if isinstance(keywords, KeywordMatcher) else KeywordMatcher(keywords)
+        self.session = session
+        self.dedup = dedup
+        self.pending = set()
+        self.remainder = b''
+        self.matches: List[Tuple[bytes, bytes]] = []
+        self.last_flush = time.monotonic()
+        self.failed = False
+        self.stats = {'lines': 0, 'matches': 0, 'indexed': 0, 'bulk_requests': 0}
+
+    async def feed(self, chunk: bytes):
+        data = self.remainder + chunk
+        cut = data.rfind(b'\n')
+        if cut >= 0:
+            self.remainder = data[cut + 1:]
+            await self.process(data[:cut])
+        else:
+            self.remainder = data
+
+        if len(self.matches) >= BULK_MAX_DOCS or \
+                (self.matches and time.monotonic() - self.last_flush >= BULK_FLUSH_SECONDS):
+            await self.flush()
+
+    async def close(self):
+        if self.remainder:
+            await self.process(self.remainder)
+            self.remainder = b''
+        await self.flush()
+
+    async def process(self, data: bytes):
+        hits = await asyncio.to_thread(self.match_lines, data)
+        self.stats['matches'] += len(hits)
+        self.matches.extend(hits)
+
+    def match_lines(self, data: bytes) -> List[Tuple[bytes, bytes]]:
+        self.stats['lines'] += data.count(b'\n') + 1
+        hits = self.keywords.find_lines(data)
+
+        if hits and self.dedup:
+            keywords = dict(hits)
+            fresh = self.dedup.filter_chunk([line for line, _ in hits], record=False, pending=self.pending)
+            hits = [(line, keywords[line]) for line in fresh]
+        return hits
+
+    def build_payload(self, matches: List[Tuple[bytes, bytes]]) -> bytes:
+        action = json.dumps({"index": {"_index": OPENSEARCH_INDEX}})
+        out = []
+        for line, keyword in matches:
+            text = CONTROL_CHARS.sub('', line.decode('utf-8', errors='replace'))
+            out.append(action)
+            out.append(json.dumps({"line": text, "keyword": keyword.decode('utf-8', errors='replace')},
+                                  ensure_ascii=False))
+        return ('\n'.join(out) + '\n').encode('utf-8')
+
+    async def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.matches:
+            return
+
+        matches, self.matches = self.matches, []
+        auth = None
+        if os.getenv("OPENSEARCH_USER"):
+            auth = aiohttp.BasicAuth(os.getenv("OPENSEARCH_USER"), os.getenv("OPENSEARCH_PASS", ""))
+
+        self.stats['bulk_requests'] += 1
+        payload = await asyncio.to_thread(self.build_payload, matches)
+        try:
+            async with self.session.post(f"{OPENSEARCH_URL}/_bulk", data=payload, auth=auth,
+                                         headers={"Content-Type": "application/x-ndjson"}) as resp:
+                if resp.status != 200:
+                    print(f"\n❌ Stream upload failed for {self.source} (HTTP {resp.status})")
+                    self.failed = True
+                    return
+                body = await resp.json(content_type=None)
+        except (aiohttp.ClientError, ValueError) as e:
+            print(f"\n❌ Stream upload failed for {self.source}: {e}")
+            self.failed = True
+            return
+
+        # _bulk answers 200 even when items are rejected; only accepted lines are recorded.
+        accepted = [line for line, _ in matches]
+        if body.get('errors'):
+            ok = bulk_accepted(body)
+            accepted = [line for line, kept in zip(accepted, ok) if kept] if len(ok) == len(matches) else []
+            print(f"\n❌ OpenSearch rejected {len(matches) - len(accepted)} of {len(matches)} documents from {self.source}")
+            self.failed = True
+
+        self.stats['indexed'] += len(accepted)
+        if self.dedup and accepted:
+            await asyncio.to_thread(self.dedup.record, accepted)
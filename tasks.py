@@ -1,12 +1,18 @@
+import os
 import subprocess
 import shlex
 
+from retention import mark_parsed_file
+
 def run_bash_script(file_path: str):
     """
     Run bash script with arguments:
-    bash ./parse2.sh <file_path> --keywords-file ./urlsevplat.txt --upload
+    bash ./parse.sh <file_path> --keywords-file ./urlsevplat.txt --upload
+
+    The script can be overridden with the PARSE_SCRIPT environment variable.
     """
-    command = f"bash ./parse2.sh {shlex.quote(file_path)} --keywords-file ./urlsevplat.txt --upload"
+    script = os.getenv("PARSE_SCRIPT", "./parse.sh")
+    command = f"bash {shlex.quote(script)} {shlex.quote(file_path)} --keywords-file ./urlsevplat.txt --upload"
 
     try:
         result = subprocess.run(
@@ -16,6 +22,10 @@ def run_bash_script(file_path: str):
             text=True,
             check=True
         )
+        try:
+            mark_parsed_file(file_path)
+        except Exception as e:
+            print(f"Failed to record parse completion for {file_path}: {e}")
         return {
             "status": "success",
             "stdout": result.stdout,
@@ -7,25 +7,35 @@ import time
 import aiohttp
 import sys
 import uuid
+import gzip
+import shutil
 import warnings
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 from io import StringIO
 from telethon import TelegramClient
 from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument, MessageMediaWebPage, User, PeerChannel
-from telethon.errors import FloodWaitError, SessionPasswordNeededError
+from telethon.errors import FloodWaitError, SessionPasswordNeededError, ChannelPrivateError, ChannelInvalidError
 import qrcode
 import requests
 from dotenv import load_dotenv
 from redis import Redis
 from rq import Queue
 from tasks import run_bash_script
+from dedup import LineDedup
+from stream_parse import KeywordMatcher, StreamMatcher, load_keywords
+from retention import ensure_media_files_table, file_checksum, record_download, mark_parsed
+from concurrency import AIMDLimiter
+from session_pool import SessionPool
 
 load_dotenv()
 
 warnings.filterwarnings("ignore", message="Using async sessions support is an experimental feature")
 
+TEXT_EXTENSIONS = {'.txt', '.csv', '.log', '.sql', '.json'}
+
 def display_ascii_art():
     WHITE = "\033[97m"
     RESET = "\033[0m"
@@ -60,9 +70,22 @@ class OptimizedTelegramScraper:
         self.client = None
         self.continuous_scraping_active = False
         self.max_concurrent_downloads = 5
+        self.max_download_limit = 20
+        self.flood_sleep_threshold = 5
+        self.download_request_size = 512 * 1024
+        self.partial_checkpoint_bytes = 8 * 1024 * 1024
+        self.pool = SessionPool(limiter_factory=lambda: AIMDLimiter(initial=self.max_concurrent_downloads,
+                                                                    max_limit=self.max_download_limit))
         self.batch_size = 100
-        self.state_save_interval = 50
+        self.media_fetch_batch_size = 100
+        self.backfill_ranges = 4
+        self.backfill_min_range_size = 5000
         self.db_connections = {}
+        self.CATALOG_FILE = 'catalog.db'
+        self.catalog_conn = None
+        self.http_session = None
+        self.line_dedup = None
+        self.keywords = None
         
     def load_state(self) -> Dict[str, Any]:
         if os.path.exists(self.STATE_FILE):
@@ -76,6 +99,9 @@ class OptimizedTelegramScraper:
             'api_hash': None,
             'channels': {},
             'scrape_media': True,
+            'stream_parse': False,
+            'retention': {'max_bytes': None, 'max_age_days': None, 'order': 'oldest'},
+            'compress_text': False,
         }
 
     def save_state(self):
@@ -98,9 +124,13 @@ class OptimizedTelegramScraper:
                            message TEXT, media_type TEXT, media_path TEXT, reply_to INTEGER)''')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_message_id ON messages(message_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_date ON messages(date)')
+            conn.execute('''CREATE TABLE IF NOT EXISTS partial_downloads
+                          (message_id INTEGER PRIMARY KEY, part_path TEXT, expected_size INTEGER,
+                           offset INTEGER, updated_at TEXT)''')
             conn.execute('PRAGMA journal_mode=WAL')
             conn.execute('PRAGMA synchronous=NORMAL')
             conn.commit()
+            ensure_media_files_table(conn)
             self.db_connections[channel] = conn
         
         return self.db_connections[channel]
@@ -109,12 +139,110 @@ class OptimizedTelegramScraper:
         for conn in self.db_connections.values():
             conn.close()
         self.db_connections.clear()
+        if self.catalog_conn:
+            self.catalog_conn.close()
+            self.catalog_conn = None
+
+    def get_catalog_connection(self) -> sqlite3.Connection:
+        if self.catalog_conn is None:
+            conn = sqlite3.connect(self.CATALOG_FILE, check_same_thread=False)
+            conn.execute('''CREATE TABLE IF NOT EXISTS channels
+                          (channel TEXT PRIMARY KEY, message_count INTEGER NOT NULL DEFAULT 0,
+                           last_message_id INTEGER NOT NULL DEFAULT 0, media_count INTEGER NOT NULL DEFAULT 0,
+                           media_files INTEGER NOT NULL DEFAULT 0, media_bytes INTEGER NOT NULL DEFAULT 0,
+                           updated_at TEXT)''')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.commit()
+            self.catalog_conn = conn
+
+        return self.catalog_conn
+
+    def update_catalog(self, channel: str, messages: int = 0, last_message_id: int = 0,
+                       media: int = 0, media_files: int = 0, media_bytes: int = 0):
+        conn = self.get_catalog_connection()
+        if not conn.execute('SELECT 1 FROM channels WHERE channel = ?', (channel,)).fetchone():
+            # First sighting: seed from the channel database so the deltas apply to real totals.
+            self.rebuild_catalog_entry(channel)
+            return
+
+        conn.execute('''UPDATE channels SET message_count = message_count + ?,
+                           last_message_id = MAX(last_message_id, ?), media_count = media_count + ?,
+                           media_files = media_files + ?, media_bytes = media_bytes + ?,
+                           updated_at = datetime('now')
+                        WHERE channel = ?''',
+                     (messages, last_message_id, media, media_files, media_bytes, channel))
+        conn.commit()
+
+    def rebuild_catalog_entry(self, channel: str):
+        cursor = self.get_db_connection(channel).cursor()
+        cursor.execute('''SELECT COUNT(*), COALESCE(MAX(message_id), 0),
+                                 COUNT(CASE WHEN media_type IS NOT NULL AND media_type != "MessageMediaWebPage" THEN 1 END)
+                          FROM messages''')
+        message_count, last_message_id, media_count = cursor.fetchone()
+
+        cursor.execute('SELECT media_path FROM messages WHERE media_path IS NOT NULL AND media_path != ""')
+        media_files = 0
+        media_bytes = 0
+        for (media_path,) in cursor:
+            media_files += 1
+            try:
+                media_bytes += os.path.getsize(media_path)
+            except OSError:
+                pass
+
+        conn = self.get_catalog_connection()
+        conn.execute('''INSERT OR REPLACE INTO channels
+                        (channel, message_count, last_message_id, media_count, media_files, media_bytes, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, datetime('now'))''',
+                     (channel, message_count, last_message_id, media_count, media_files, media_bytes))
+        conn.commit()
+
+    def get_catalog(self, channels: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        conn = self.get_catalog_connection()
+        channels = list(self.state['channels']) if channels is None else channels
+        known = {row[0] for row in conn.execute('SELECT channel FROM channels')}
+        for channel in channels:
+            if channel not in known and (Path(channel) / f'{channel}.db').exists():
+                self.rebuild_catalog_entry(channel)
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM channels')
+        columns = [description[0] for description in cursor.description]
+        rows = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+        return {channel: rows[channel] for channel in channels if channel in rows}
+
+    def query_channels(self, sql: str, params: tuple = (), channels: Optional[List[str]] = None) -> List[tuple]:
+        """Run ``sql`` against each channel database, attached on demand as ``channel_db``.
+
+        Rows are returned prefixed with the channel they came from, e.g.
+        ``query_channels('SELECT COUNT(*) FROM channel_db.messages WHERE message LIKE ?', ('%pass%',))``.
+        """
+        conn = self.get_catalog_connection()
+        channels = list(self.state['channels']) if channels is None else channels
+        results = []
+        for channel in channels:
+            db_file = Path(channel) / f'{channel}.db'
+            if not db_file.exists():
+                continue
+            conn.execute('ATTACH DATABASE ? AS channel_db', (str(db_file),))
+            try:
+                results.extend((channel,) + tuple(row) for row in conn.execute(sql, params))
+            finally:
+                conn.execute('DETACH DATABASE channel_db')
+        return results
 
     def batch_insert_messages(self, channel: str, messages: List[MessageData]):
         if not messages:
             return
             
         conn = self.get_db_connection(channel)
+        message_ids = [msg.message_id for msg in messages]
+        placeholders = ','.join('?' * len(message_ids))
+        existing = {row[0] for row in conn.execute(
+            f'SELECT message_id FROM messages WHERE message_id IN ({placeholders})', message_ids)}
+        new_messages = [msg for msg in messages if msg.message_id not in existing]
+
         data = [(msg.message_id, msg.date, msg.sender_id, msg.first_name, 
                 msg.last_name, msg.username, msg.message, msg.media_type, 
                 msg.media_path, msg.reply_to) for msg in messages]
@@ -125,6 +253,16 @@ class OptimizedTelegramScraper:
                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', data)
         conn.commit()
 
+        media_files = [msg.media_path for msg in new_messages if msg.media_path]
+        self.update_catalog(
+            channel,
+            messages=len(new_messages),
+            last_message_id=max(message_ids),
+            media=sum(1 for msg in new_messages if msg.media_type and msg.media_type != 'MessageMediaWebPage'),
+            media_files=len(media_files),
+            media_bytes=sum(os.path.getsize(path) for path in media_files if os.path.exists(path)),
+        )
+
     async def download_media(self, channel: str, message) -> Optional[str]:
         if not message.media or not self.state['scrape_media']:
             return None
@@ -151,33 +289,174 @@ class OptimizedTelegramScraper:
             unique_filename = f"{message.id}-{base_name}{extension}"
             media_path = media_folder / unique_filename
             
-            existing_files = list(media_folder.glob(f"{message.id}-*"))
+            existing_files = [f for f in media_folder.glob(f"{message.id}-*") if f.suffix != '.part']
             if existing_files:
                 return str(existing_files[0])
 
-            for attempt in range(3):
-                try:
-                    downloaded_path = await message.download_media(file=str(media_path))
-                    if downloaded_path and Path(downloaded_path).exists():
-                        self.queue(downloaded_path)
-                        return downloaded_path
-                    else:
-                        return None
-                except FloodWaitError as e:
-                    if attempt < 2:
-                        await asyncio.sleep(e.seconds)
-                    else:
-                        return None
-                except Exception:
-                    if attempt < 2:
-                        await asyncio.sleep(2 ** attempt)
-                    else:
-                        return None
-            
+            stream = self.state.get('stream_parse') and self.is_text_document(message)
+
+            member = self.pool.member_for(channel)
+            limiter = member.limiter
+            failover = False
+            async with limiter:
+                for attempt in range(3):
+                    try:
+                        if stream:
+                            downloaded_path, parsed = await self.stream_download_media(channel, message, media_path)
+                        elif isinstance(message.media, MessageMediaDocument):
+                            downloaded_path, parsed = await self.download_document(channel, message, media_path), False
+                        else:
+                            downloaded_path, parsed = await message.download_media(file=str(media_path)), False
+                        if downloaded_path and Path(downloaded_path).exists():
+                            limiter.record_success(os.path.getsize(downloaded_path))
+                            if self.state.get('compress_text') and self.is_text_document(message):
+                                downloaded_path = await asyncio.to_thread(self.compress_media, downloaded_path)
+                            if parsed:
+                                mark_parsed(self.get_db_connection(channel), downloaded_path)
+                            else:
+                                self.queue(downloaded_path)
+                            return downloaded_path
+                        else:
+                            return None
+                    except FloodWaitError as e:
+                        if self.pool.report_flood_wait(member.client, e.seconds, channel):
+                            # Session benched and another is free; retry there once this slot is released.
+                            failover = True
+                            break
+                        if attempt < 2:
+                            await limiter.wait_if_paused()
+                        else:
+                            return None
+                    except Exception as e:
+                        if isinstance(e, (asyncio.TimeoutError, ConnectionError)):
+                            limiter.record_timeout()
+                        if attempt < 2:
+                            await asyncio.sleep(2 ** attempt)
+                        else:
+                            return None
+
+            if failover:
+                message = await self.refetch_message(channel, message)
+                return await self.download_media(channel, message) if message else None
             return None
         except Exception:
             return None
         
+    def is_text_document(self, message) -> bool:
+        if not isinstance(message.media, MessageMediaDocument) or not message.file:
+            return False
+        mime_type = getattr(message.file, 'mime_type', None) or ''
+        extension = Path(getattr(message.file, 'name', None) or '').suffix.lower() or (message.file.ext or '').lower()
+        return mime_type.startswith('text/') or extension in TEXT_EXTENSIONS
+
+    async def download_document(self, channel: str, message, media_path: Path,
+                                matcher: Optional[StreamMatcher] = None) -> Optional[str]:
+        conn = self.get_db_connection(channel)
+        member = self.pool.member_for(channel)
+        client = member.client
+        part_path = media_path.with_name(media_path.name + '.part')
+        expected_size = getattr(message.file, 'size', None) if message.file else None
+
+        offset = 0
+        row = conn.execute('SELECT offset FROM partial_downloads WHERE message_id = ?', (message.id,)).fetchone()
+        if row and part_path.exists():
+            # Only trust bytes that were both checkpointed and are still on disk, and
+            # restart on a request boundary so Telegram accepts the offset.
+            offset = min(row[0], part_path.stat().st_size)
+            offset -= offset % self.download_request_size
+
+        conn.execute('''INSERT OR REPLACE INTO partial_downloads (message_id, part_path, expected_size, offset, updated_at)
+                        VALUES (?, ?, ?, ?, datetime('now'))''', (message.id, str(part_path), expected_size, offset))
+        conn.commit()
+
+        def checkpoint(f):
+            f.flush()
+            os.fsync(f.fileno())
+            conn.execute("UPDATE partial_downloads SET offset = ?, updated_at = datetime('now') WHERE message_id = ?",
+                         (f.tell(), message.id))
+            conn.commit()
+
+        with open(part_path, 'r+b' if offset else 'wb') as f:
+            f.truncate(offset)
+            f.seek(offset)
+
+            if offset and matcher:
+                # Lines before the offset may not have reached the index; dedup drops the ones that did.
+                with open(part_path, 'rb') as existing:
+                    while existing.tell() < offset:
+                        await matcher.feed(existing.read(min(self.download_request_size, offset - existing.tell())))
+
+            limit = None
+            if expected_size:
+                limit = -(-(expected_size - offset) // self.download_request_size)
+
+            unsynced = 0
+            try:
+                async for chunk in client.iter_download(message.media, offset=offset, limit=limit,
+                                                             request_size=self.download_request_size,
+                                                             file_size=expected_size):
+                    f.write(chunk)
+                    if matcher:
+                        await matcher.feed(chunk)
+                    unsynced += len(chunk)
+                    if unsynced >= self.partial_checkpoint_bytes:
+                        checkpoint(f)
+                        unsynced = 0
+                    # A FloodWait on another download pauses this one before its next request.
+                    await member.limiter.wait_if_paused()
+            finally:
+                checkpoint(f)
+
+        actual_size = part_path.stat().st_size
+        if expected_size and actual_size != expected_size:
+            if actual_size > expected_size:
+                part_path.unlink()
+                conn.execute('DELETE FROM partial_downloads WHERE message_id = ?', (message.id,))
+                conn.commit()
+            raise IOError(f"Size mismatch for {media_path}: {actual_size} of {expected_size} bytes")
+
+        if matcher:
+            await matcher.close()
+
+        os.replace(part_path, media_path)
+        conn.execute('DELETE FROM partial_downloads WHERE message_id = ?', (message.id,))
+        conn.commit()
+        return str(media_path)
+
+    def compress_media(self, media_path: str) -> str:
+        # gzip rather than a faster codec so parse.sh can stream it with plain `gzip -dc`.
+        # Written under a .part name the existing-file glob skips, so a crash mid-write
+        # never leaves a truncated .gz that looks like a finished download.
+        compressed_path = f"{media_path}.gz"
+        part_path = f"{compressed_path}.part"
+        with open(media_path, 'rb') as src, gzip.open(part_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(part_path, compressed_path)
+        os.remove(media_path)
+        return compressed_path
+
+    async def stream_download_media(self, channel: str, message, media_path: Path) -> tuple:
+        if self.http_session is None:
+            self.http_session = aiohttp.ClientSession()
+        if self.line_dedup is None:
+            self.line_dedup = LineDedup()
+        if self.keywords is None:
+            self.keywords = KeywordMatcher(load_keywords())
+
+        matcher = StreamMatcher(str(media_path), self.keywords, self.http_session, self.line_dedup)
+        await self.download_document(channel, message, media_path, matcher)
+
+        # Fall back to the queued bash parse if any bulk upload was rejected.
+        return str(media_path), not matcher.failed
+
+    async def close_stream_resources(self):
+        if self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+        if self.line_dedup:
+            self.line_dedup.close()
+            self.line_dedup = None
+
     def queue(self, file_path: str):
         try:
             redis_conn = Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", "6379")))
@@ -191,14 +470,191 @@ class OptimizedTelegramScraper:
 
     async def update_media_path(self, channel: str, message_id: int, media_path: str):
         conn = self.get_db_connection(channel)
+        row = conn.execute('SELECT media_path FROM messages WHERE message_id = ?', (message_id,)).fetchone()
         conn.execute('UPDATE messages SET media_path = ? WHERE message_id = ?', 
                     (media_path, message_id))
         conn.commit()
 
+        if not os.path.exists(media_path):
+            return
+
+        stat = os.stat(media_path)
+        size = stat.st_size
+        checksum = await asyncio.to_thread(file_checksum, media_path)
+        record_download(conn, media_path, message_id, size, checksum, stat.st_mtime)
+
+        if row and not row[0]:
+            self.update_catalog(channel, media_files=1, media_bytes=size)
+
+    def enforce_retention(self, channels: Optional[List[str]] = None) -> Dict[str, int]:
+        policy = self.state.get('retention') or {}
+        max_bytes = policy.get('max_bytes')
+        max_age_days = policy.get('max_age_days')
+        result = {'files': 0, 'bytes': 0}
+        if not max_bytes and not max_age_days:
+            return result
+
+        channels = list(self.state['channels']) if channels is None else channels
+        for channel in channels:
+            self.get_db_connection(channel)
+
+        rows = self.query_channels('''SELECT media_path, size, downloaded_at, parsed_at IS NOT NULL
+                                      FROM channel_db.media_files WHERE evicted_at IS NULL''', channels=channels)
+        files = []
+        for channel, media_path, size, downloaded_at, parsed in rows:
+            # A parse job can finish before the download is recorded; wait for the record.
+            if downloaded_at is None:
+                continue
+            if size is None:
+                size = os.path.getsize(media_path) if os.path.exists(media_path) else 0
+            files.append((channel, media_path, size, downloaded_at, parsed))
+
+        on_disk = sum(f[2] for f in files)
+        # Only files whose parse job has finished are ever evicted.
+        candidates = [f for f in files if f[4]]
+        if policy.get('order') == 'largest':
+            candidates.sort(key=lambda f: f[2], reverse=True)
+        else:
+            candidates.sort(key=lambda f: f[3])
+
+        evict = []
+        if max_age_days:
+            cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+            evict = [f for f in candidates if f[3] < cutoff]
+            on_disk -= sum(f[2] for f in evict)
+        if max_bytes:
+            for f in candidates:
+                if on_disk <= max_bytes:
+                    break
+                if f not in evict:
+                    evict.append(f)
+                    on_disk -= f[2]
+
+        for channel, media_path, size, _, _ in evict:
+            try:
+                os.remove(media_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"❌ Could not evict {media_path}: {e}")
+                continue
+
+            # messages.media_path and the checksum stay, so the file is not seen as missing.
+            conn = self.get_db_connection(channel)
+            conn.execute("UPDATE media_files SET evicted_at = datetime('now') WHERE media_path = ?", (media_path,))
+            conn.commit()
+            self.update_catalog(channel, media_bytes=-size)
+            result['files'] += 1
+            result['bytes'] += size
+
+        if result['files']:
+            print(f"🧹 Evicted {result['files']} processed media files ({result['bytes'] / (1024 * 1024):.1f} MB)")
+        if max_bytes and on_disk > max_bytes:
+            print(f"⚠️  Media still uses {on_disk / (1024 ** 3):.2f} GB; remaining files are not parsed yet")
+
+        return result
+
+    async def configure_retention(self):
+        policy = self.state.setdefault('retention', {'max_bytes': None, 'max_age_days': None, 'order': 'oldest'})
+        max_gb = f"{policy['max_bytes'] / (1024 ** 3):g} GB" if policy.get('max_bytes') else 'OFF'
+        max_days = f"{policy['max_age_days']} days" if policy.get('max_age_days') else 'OFF'
+        print(f"\n🧹 Retention: size budget {max_gb}, max age {max_days}, evict {policy.get('order', 'oldest')} first")
+
+        try:
+            value = input("Size budget in GB (Enter to keep, 0 to disable): ").strip()
+            if value:
+                policy['max_bytes'] = int(float(value) * 1024 ** 3) or None
+            value = input("Max age in days (Enter to keep, 0 to disable): ").strip()
+            if value:
+                policy['max_age_days'] = int(value) or None
+        except ValueError:
+            print("Invalid number")
+            return
+
+        value = input("Evict oldest or largest first? (Enter to keep): ").strip().lower()
+        if value in ('oldest', 'largest'):
+            policy['order'] = value
+
+        self.save_state()
+        self.enforce_retention()
+
+    async def sleep_flood_wait(self, client, seconds: int, channel: Optional[str] = None) -> bool:
+        # Clients raise FloodWaits above flood_sleep_threshold so downloads can adapt;
+        # history and metadata requests report them and wait here instead. Returns
+        # True without waiting when the session was benched and the channel can move.
+        if self.pool.report_flood_wait(client, seconds, channel):
+            return True
+        print(f"\n⏳ FloodWait of {seconds}s, waiting before retrying")
+        await asyncio.sleep(seconds)
+        return False
+
+    async def flood_wait_retry(self, client, request):
+        while True:
+            try:
+                return await request()
+            except FloodWaitError as e:
+                self.pool.report_flood_wait(client, e.seconds)
+                print(f"\n⏳ FloodWait of {e.seconds}s, waiting before retrying")
+                await asyncio.sleep(e.seconds)
+
+    async def resolve_channel(self, channel: str):
+        """Return the pool member assigned to ``channel`` and the entity as that session sees it.
+
+        Entities carry a per-account access hash, so they must be resolved again
+        after a channel moves to another session.
+        """
+        while True:
+            member = self.pool.member_for(channel)
+            client = member.client
+            try:
+                entity = await client.get_entity(PeerChannel(int(channel)) if channel.startswith('-') else channel)
+                return member, entity
+            except FloodWaitError as e:
+                await self.sleep_flood_wait(client, e.seconds, channel)
+            except (ValueError, ChannelPrivateError, ChannelInvalidError):
+                # Not joined or no cached access hash: try the next session that might be.
+                self.pool.mark_unreachable(member, channel)
+
+    async def refetch_message(self, channel: str, message):
+        # File references are tied to the session that fetched the message.
+        member, entity = await self.resolve_channel(channel)
+        return await self.flood_wait_retry(member.client, lambda: member.client.get_messages(entity, ids=message.id))
+
+    async def build_message_data(self, message) -> MessageData:
+        sender = await message.get_sender()
+
+        return MessageData(
+            message_id=message.id,
+            date=message.date.strftime('%Y-%m-%d %H:%M:%S'),
+            sender_id=message.sender_id,
+            first_name=getattr(sender, 'first_name', None) if isinstance(sender, User) else None,
+            last_name=getattr(sender, 'last_name', None) if isinstance(sender, User) else None,
+            username=getattr(sender, 'username', None) if isinstance(sender, User) else None,
+            message=message.message or '',
+            media_type=message.media.__class__.__name__ if message.media else None,
+            media_path=None,
+            reply_to=message.reply_to_msg_id if message.reply_to else None
+        )
+
     async def scrape_channel(self, channel: str, offset_id: int):
+        if channel in self.state.get('backfill', {}):
+            print(f"Resuming interrupted backfill of channel {channel}")
+            await self.backfill_channel(channel)
+            if channel in self.state.get('backfill', {}):
+                # Still incomplete; scraping on from here would leave the gap behind the offset.
+                print(f"Backfill of channel {channel} is still incomplete, skipping it for now")
+                return
+            offset_id = self.state['channels'][channel]
+
         try:
-            entity = await self.client.get_entity(PeerChannel(int(channel)) if channel.startswith('-') else channel)
-            result = await self.client.get_messages(entity, offset_id=offset_id, reverse=True, limit=0)
+            while True:
+                member, entity = await self.resolve_channel(channel)
+                client = member.client
+                try:
+                    result = await client.get_messages(entity, offset_id=offset_id, reverse=True, limit=0)
+                    break
+                except FloodWaitError as e:
+                    await self.sleep_flood_wait(client, e.seconds, channel)
             total_messages = result.total
 
             if total_messages == 0:
@@ -211,51 +667,46 @@ class OptimizedTelegramScraper:
             media_tasks = []
             processed_messages = 0
             last_message_id = offset_id
-            semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
 
-            async for message in self.client.iter_messages(entity, offset_id=offset_id, reverse=True):
+            while True:
                 try:
-                    sender = await message.get_sender()
-                    
-                    msg_data = MessageData(
-                        message_id=message.id,
-                        date=message.date.strftime('%Y-%m-%d %H:%M:%S'),
-                        sender_id=message.sender_id,
-                        first_name=getattr(sender, 'first_name', None) if isinstance(sender, User) else None,
-                        last_name=getattr(sender, 'last_name', None) if isinstance(sender, User) else None,
-                        username=getattr(sender, 'username', None) if isinstance(sender, User) else None,
-                        message=message.message or '',
-                        media_type=message.media.__class__.__name__ if message.media else None,
-                        media_path=None,
-                        reply_to=message.reply_to_msg_id if message.reply_to else None
-                    )
-                    
-                    message_batch.append(msg_data)
+                    # On a FloodWait, resume after the last message already collected.
+                    async for message in client.iter_messages(entity, offset_id=last_message_id, reverse=True):
+                        try:
+                            msg_data = await self.build_message_data(message)
 
-                    if self.state['scrape_media'] and message.media and not isinstance(message.media, MessageMediaWebPage):
-                        media_tasks.append(message)
+                            message_batch.append(msg_data)
 
-                    last_message_id = message.id
-                    processed_messages += 1
+                            if self.state['scrape_media'] and message.media and not isinstance(message.media, MessageMediaWebPage):
+                                media_tasks.append(message)
 
-                    if len(message_batch) >= self.batch_size:
-                        self.batch_insert_messages(channel, message_batch)
-                        message_batch.clear()
+                            last_message_id = message.id
+                            processed_messages += 1
 
-                    if processed_messages % self.state_save_interval == 0:
-                        self.state['channels'][channel] = last_message_id
-                        self.save_state()
+                            # Checkpoint only IDs that are already in the database.
+                            if len(message_batch) >= self.batch_size:
+                                self.batch_insert_messages(channel, message_batch)
+                                message_batch.clear()
+                                self.state['channels'][channel] = last_message_id
+                                self.save_state()
 
-                    progress = (processed_messages / total_messages) * 100
-                    bar_length = 30
-                    filled_length = int(bar_length * processed_messages // total_messages)
-                    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                    
-                    sys.stdout.write(f"\r📄 Messages: [{bar}] {progress:.1f}% ({processed_messages}/{total_messages})")
-                    sys.stdout.flush()
+                            progress = (processed_messages / total_messages) * 100
+                            bar_length = 30
+                            filled_length = int(bar_length * processed_messages // total_messages)
+                            bar = '█' * filled_length + '░' * (bar_length - filled_length)
 
-                except Exception as e:
-                    print(f"\nError processing message {message.id}: {e}")
+                            sys.stdout.write(f"\r📄 Messages: [{bar}] {progress:.1f}% ({processed_messages}/{total_messages})")
+                            sys.stdout.flush()
+
+                        except FloodWaitError:
+                            raise
+                        except Exception as e:
+                            print(f"\nError processing message {message.id}: {e}")
+                    break
+                except FloodWaitError as e:
+                    if await self.sleep_flood_wait(client, e.seconds, channel):
+                        member, entity = await self.resolve_channel(channel)
+                        client = member.client
 
             if message_batch:
                 self.batch_insert_messages(channel, message_batch)
@@ -266,34 +717,24 @@ class OptimizedTelegramScraper:
                 successful_downloads = 0
                 print(f"\n📥 Downloading {total_media} media files...")
                 
-                semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
+                pending_media = iter(media_tasks)
                 
-                async def download_single_media(message):
-                    async with semaphore:
-                        return await self.download_media(channel, message)
-                
-                batch_size = 10
-                for i in range(0, len(media_tasks), batch_size):
-                    batch = media_tasks[i:i + batch_size]
-                    tasks = [asyncio.create_task(download_single_media(msg)) for msg in batch]
-                    
-                    for j, task in enumerate(tasks):
+                # Enough workers for the limiter's ceiling; the limiter decides how many run.
+                async def download_worker():
+                    nonlocal completed_media, successful_downloads
+                    for message in pending_media:
                         try:
-                            media_path = await task
+                            media_path = await self.download_media(channel, message)
                             if media_path:
-                                await self.update_media_path(channel, batch[j].id, media_path)
+                                await self.update_media_path(channel, message.id, media_path)
                                 successful_downloads += 1
                         except Exception:
                             pass
                         
                         completed_media += 1
-                        progress = (completed_media / total_media) * 100
-                        bar_length = 30
-                        filled_length = int(bar_length * completed_media // total_media)
-                        bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                        
-                        sys.stdout.write(f"\r📥 Media: [{bar}] {progress:.1f}% ({completed_media}/{total_media})")
-                        sys.stdout.flush()
+                        self.print_progress("📥 Media", completed_media, total_media)
+                
+                await asyncio.gather(*(download_worker() for _ in range(self.max_download_limit)))
                 
                 print(f"\n✅ Media download complete! ({successful_downloads}/{total_media} successful)")
 
@@ -304,131 +745,254 @@ class OptimizedTelegramScraper:
         except Exception as e:
             print(f"Error with channel {channel}: {e}")
 
-    async def rescrape_media(self, channel: str):
-        conn = self.get_db_connection(channel)
-        cursor = conn.cursor()
-        cursor.execute('SELECT message_id FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage" AND media_path IS NULL')
-        message_ids = [row[0] for row in cursor.fetchall()]
+    def split_backfill_ranges(self, start_id: int, latest_id: int) -> List[Dict[str, int]]:
+        span = latest_id - start_id
+        count = max(1, min(self.backfill_ranges, span // self.backfill_min_range_size))
+        step = -(-span // count)
+        ranges = []
+        for lower in range(start_id, latest_id, step):
+            upper = min(lower + step, latest_id)
+            # 'last' is the sub-checkpoint: every ID up to it has been stored.
+            ranges.append({'start': lower, 'end': upper, 'last': lower})
+        return ranges
 
-        if not message_ids:
-            print(f"No media files to reprocess for channel {channel}")
+    async def backfill_channel(self, channel: str):
+        try:
+            member, entity = await self.resolve_channel(channel)
+            client = member.client
+        except Exception as e:
+            print(f"Error with channel {channel}: {e}")
             return
 
-        print(f"📥 Reprocessing {len(message_ids)} media files for channel {channel}")
+        backfill = self.state.setdefault('backfill', {})
+        ranges = backfill.get(channel)
+        if not ranges:
+            latest = await self.flood_wait_retry(client, lambda: client.get_messages(entity, limit=1))
+            if not latest:
+                print(f"No messages found in channel {channel}")
+                return
 
-        try:
-            entity = await self.client.get_entity(PeerChannel(int(channel)))
-            semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
-            completed_media = 0
-            successful_downloads = 0
-            
-            async def download_single_media(message):
-                async with semaphore:
-                    return await self.download_media(channel, message)
-
-            batch_size = 10
-            for i in range(0, len(message_ids), batch_size):
-                batch_ids = message_ids[i:i + batch_size]
-                messages = await self.client.get_messages(entity, ids=batch_ids)
-                
-                valid_messages = [msg for msg in messages if msg and msg.media and not isinstance(msg.media, MessageMediaWebPage)]
-                tasks = [asyncio.create_task(download_single_media(msg)) for msg in valid_messages]
+            start_id = self.state['channels'].get(channel, 0)
+            if latest[0].id <= start_id:
+                print(f"Channel {channel} is already up to date")
+                return
 
-                for j, task in enumerate(tasks):
-                    try:
-                        media_path = await task
-                        if media_path:
-                            await self.update_media_path(channel, valid_messages[j].id, media_path)
-                            successful_downloads += 1
-                    except Exception:
-                        pass
-                    
-                    completed_media += 1
-                    progress = (completed_media / len(message_ids)) * 100
-                    bar_length = 30
-                    filled_length = int(bar_length * completed_media // len(message_ids))
-                    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                    
-                    sys.stdout.write(f"\r🔄 Rescrape: [{bar}] {progress:.1f}% ({completed_media}/{len(message_ids)})")
-                    sys.stdout.flush()
+            ranges = self.split_backfill_ranges(start_id, latest[0].id)
+            backfill[channel] = ranges
+            self.save_state()
 
-            print(f"\n✅ Media reprocessing complete! ({successful_downloads}/{len(message_ids)} successful)")
+        total = sum(r['end'] - r['start'] for r in ranges)
+        print(f"⚡ Backfilling channel {channel} in {len(ranges)} parallel ID ranges ({total} IDs)")
 
-        except Exception as e:
-            print(f"Error reprocessing media: {e}")
+        def completed() -> int:
+            return sum(r['last'] - r['start'] for r in ranges)
+
+        async def scrape_range(id_range: Dict[str, int]):
+            range_client, range_entity = client, entity
+            message_batch = []
+
+            def flush():
+                if message_batch:
+                    self.batch_insert_messages(channel, message_batch)
+                    id_range['last'] = message_batch[-1].message_id
+                    message_batch.clear()
+                    self.save_state()
+                self.print_progress("⚡ Backfill", completed(), total)
+
+            last_seen = id_range['last']
+            while True:
+                try:
+                    # On a FloodWait, resume after the last message already collected.
+                    async for message in range_client.iter_messages(range_entity, min_id=last_seen,
+                                                                         max_id=id_range['end'] + 1, reverse=True):
+                        try:
+                            message_batch.append(await self.build_message_data(message))
+                        except FloodWaitError:
+                            raise
+                        except Exception as e:
+                            print(f"\nError processing message {message.id}: {e}")
+                        last_seen = message.id
 
-    async def fix_missing_media(self, channel: str):
+                        if len(message_batch) >= self.batch_size:
+                            flush()
+                    break
+                except FloodWaitError as e:
+                    if await self.sleep_flood_wait(range_client, e.seconds, channel):
+                        range_member, range_entity = await self.resolve_channel(channel)
+                        range_client = range_member.client
+
+            flush()
+            id_range['last'] = id_range['end']
+            self.save_state()
+
+        results = await asyncio.gather(*(scrape_range(r) for r in ranges if r['last'] < r['end']),
+                                       return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            print(f"\n❌ Backfill of {channel} interrupted ({len(errors)} range(s) failed: {errors[0]}); rerun to resume")
+            return
+
+        # Every range is done: fold the sub-checkpoints into the normal checkpoint.
+        self.state['channels'][channel] = max(r['end'] for r in ranges)
+        del backfill[channel]
+        self.save_state()
+        self.print_progress("⚡ Backfill", total, total)
+        print(f"\n✅ Backfill of channel {channel} complete")
+
+        if self.state['scrape_media']:
+            await self.reconcile_media([channel], label="📥 Media")
+
+    async def backfill_channels(self):
+        if not self.state['channels']:
+            print("No channels available. Use [L] to add channels first")
+            return
+
+        await self.view_channels()
+        print(f"\n⚡ Backfill splits each channel's history into up to {self.backfill_ranges} ranges scraped in parallel")
+        selection = input("Enter selection (numbers, IDs or all): ").strip()
+        selected_channels = self.parse_channel_selection(selection)
+
+        if not selected_channels:
+            print("❌ No valid channels selected")
+            return
+
+        for i, channel in enumerate(selected_channels, 1):
+            print(f"\n[{i}/{len(selected_channels)}] Backfilling: {channel}")
+            await self.backfill_channel(channel)
+
+    def print_progress(self, label: str, completed: int, total: int):
+        progress = (completed / total) * 100 if total else 100.0
+        bar_length = 30
+        filled_length = int(bar_length * completed // total) if total else bar_length
+        bar = '█' * filled_length + '░' * (bar_length - filled_length)
+
+        sys.stdout.write(f"\r{label}: [{bar}] {progress:.1f}% ({completed}/{total})")
+        sys.stdout.flush()
+
+    def get_missing_media_ids(self, channel: str) -> List[int]:
         conn = self.get_db_connection(channel)
         cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage"')
-        total_with_media = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage" AND media_path IS NOT NULL')
-        total_with_files = cursor.fetchone()[0]
-        
-        missing_count = total_with_media - total_with_files
-        
-        print(f"\n📊 Media Analysis for {channel}:")
-        print(f"Messages with media: {total_with_media}")
-        print(f"Media files downloaded: {total_with_files}")
-        print(f"Missing media files: {missing_count}")
-        
-        if missing_count == 0:
+        cursor.execute('SELECT message_id FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage" AND (media_path IS NULL OR media_path = "") ORDER BY message_id')
+        return [row[0] for row in cursor.fetchall()]
+
+    def count_media(self, channel: str) -> tuple:
+        conn = self.get_db_connection(channel)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), COUNT(NULLIF(media_path, "")) FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage"')
+        total_with_media, total_with_files = cursor.fetchone()
+        return total_with_media, total_with_files
+
+    async def reconcile_media(self, channels: List[str], label: str = "🔧 Fix Media") -> Dict[str, int]:
+        pending = {}
+        for channel in channels:
+            try:
+                pending[channel] = self.get_missing_media_ids(channel)
+            except Exception as e:
+                print(f"❌ Could not read database for channel {channel}: {e}")
+
+        total_missing = sum(len(ids) for ids in pending.values())
+        if total_missing == 0:
             print("✅ All media files are already downloaded!")
-            return
-            
-        cursor.execute('SELECT message_id, media_type FROM messages WHERE media_type IS NOT NULL AND media_type != "MessageMediaWebPage" AND (media_path IS NULL OR media_path = "")')
-        missing_media = cursor.fetchall()
-        
-        if not missing_media:
-            print("✅ No missing media found!")
-            return
+            return {channel: 0 for channel in pending}
 
-        print(f"\n🔧 Attempting to download {len(missing_media)} missing media files...")
-        
-        try:
-            entity = await self.client.get_entity(PeerChannel(int(channel)))
-            semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
-            completed_media = 0
-            successful_downloads = 0
-            
-            async def download_single_media(message):
-                async with semaphore:
-                    return await self.download_media(channel, message)
-            
-            batch_size = 10
-            for i in range(0, len(missing_media), batch_size):
-                batch = missing_media[i:i + batch_size]
-                message_ids = [msg[0] for msg in batch]
-                
-                messages = await self.client.get_messages(entity, ids=message_ids)
-                valid_messages = [msg for msg in messages if msg and msg.media and not isinstance(msg.media, MessageMediaWebPage)]
-                
-                tasks = [asyncio.create_task(download_single_media(msg)) for msg in valid_messages]
+        print(f"\n📥 Reconciling {total_missing} missing media files across {len(pending)} channel(s)...")
+
+        # Bounded so at most one fetched batch waits in the queue while the next
+        # batch is prefetched; keeps file references fresh and memory flat.
+        download_queue = asyncio.Queue(maxsize=self.media_fetch_batch_size)
+        stats = {'completed': 0, 'successful': 0}
 
-                for j, task in enumerate(tasks):
+        def advance(count: int = 1):
+            stats['completed'] += count
+            self.print_progress(label, stats['completed'], total_missing)
+
+        async def download_worker():
+            while True:
+                item = await download_queue.get()
+                try:
+                    if item is None:
+                        return
+                    channel, message = item
                     try:
-                        media_path = await task
+                        media_path = await self.download_media(channel, message)
                         if media_path:
-                            await self.update_media_path(channel, valid_messages[j].id, media_path)
-                            successful_downloads += 1
+                            await self.update_media_path(channel, message.id, media_path)
+                            stats['successful'] += 1
                     except Exception:
                         pass
-                    
-                    completed_media += 1
-                    progress = (completed_media / len(missing_media)) * 100
-                    bar_length = 30
-                    filled_length = int(bar_length * completed_media // len(missing_media))
-                    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                    
-                    sys.stdout.write(f"\r🔧 Fix Media: [{bar}] {progress:.1f}% ({completed_media}/{len(missing_media)})")
-                    sys.stdout.flush()
+                    advance()
+                finally:
+                    download_queue.task_done()
 
-            print(f"\n✅ Media fix complete! ({successful_downloads}/{len(missing_media)} successful)")
+        def fetch(client, entity, ids: List[int]) -> asyncio.Task:
+            return asyncio.create_task(self.flood_wait_retry(client, lambda: client.get_messages(entity, ids=ids)))
 
-        except Exception as e:
-            print(f"Error fixing missing media: {e}")
+        workers = [asyncio.create_task(download_worker()) for _ in range(self.max_download_limit * len(self.pool))]
+
+        try:
+            for channel, message_ids in pending.items():
+                if not message_ids:
+                    continue
+
+                try:
+                    member, entity = await self.resolve_channel(channel)
+                    client = member.client
+                except Exception as e:
+                    print(f"\n❌ Could not resolve channel {channel}: {e}")
+                    advance(len(message_ids))
+                    continue
+
+                batches = [message_ids[i:i + self.media_fetch_batch_size]
+                           for i in range(0, len(message_ids), self.media_fetch_batch_size)]
+                next_fetch = fetch(client, entity, batches[0])
+
+                for index, batch_ids in enumerate(batches):
+                    try:
+                        messages = await next_fetch
+                    except Exception as e:
+                        print(f"\n❌ Failed to fetch messages for channel {channel}: {e}")
+                        messages = []
+
+                    if index + 1 < len(batches):
+                        next_fetch = fetch(client, entity, batches[index + 1])
+
+                    queued = 0
+                    for message in messages:
+                        if message and message.media and not isinstance(message.media, MessageMediaWebPage):
+                            await download_queue.put((channel, message))
+                            queued += 1
+
+                    # Deleted messages or media that is no longer available.
+                    if queued < len(batch_ids):
+                        advance(len(batch_ids) - queued)
+        finally:
+            for _ in workers:
+                await download_queue.put(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        print(f"\n✅ Media reconciliation complete! ({stats['successful']}/{total_missing} successful)")
+
+        still_missing = {}
+        for channel in pending:
+            total_with_media, total_with_files = self.count_media(channel)
+            still_missing[channel] = total_with_media - total_with_files
+            print(f"• {channel}: {still_missing[channel]} still missing")
+
+        return still_missing
+
+    async def rescrape_media(self, channels: List[str]):
+        return await self.reconcile_media(channels, label="🔄 Rescrape")
+
+    async def fix_missing_media(self, channels: List[str]):
+        for channel in channels:
+            total_with_media, total_with_files = self.count_media(channel)
+
+            print(f"\n📊 Media Analysis for {channel}:")
+            print(f"Messages with media: {total_with_media}")
+            print(f"Media files downloaded: {total_with_files}")
+            print(f"Missing media files: {total_with_media - total_with_files}")
+
+        return await self.reconcile_media(channels, label="🔧 Fix Media")
 
     async def continuous_scraping(self):
         self.continuous_scraping_active = True
@@ -437,12 +1001,9 @@ class OptimizedTelegramScraper:
             while self.continuous_scraping_active:
                 start_time = time.time()
                 
-                for channel in self.state['channels']:
-                    if not self.continuous_scraping_active:
-                        break
-                    print(f"\nChecking for new messages in channel: {channel}")
-                    await self.scrape_channel(channel, self.state['channels'][channel])
-                    print(channel, self.state['channels'][channel])
+                await self.scrape_channels(list(self.state['channels']), continuous=True)
+                
+                self.enforce_retention()
                 
                 elapsed = time.time() - start_time
                 sleep_time = max(0, 60 - elapsed)
@@ -454,6 +1015,22 @@ class OptimizedTelegramScraper:
         finally:
             self.continuous_scraping_active = False
 
+    async def scrape_channels(self, channels: List[str], continuous: bool = False):
+        # Channels sharing a session are scraped one after another; sessions run side by side.
+        async def scrape_shard(shard: List[str]):
+            for channel in shard:
+                if continuous and not self.continuous_scraping_active:
+                    break
+                if continuous:
+                    print(f"\nChecking for new messages in channel: {channel}")
+                else:
+                    print(f"\n[{channels.index(channel) + 1}/{len(channels)}] Scraping: {channel}")
+                await self.scrape_channel(channel, self.state['channels'][channel])
+                if continuous:
+                    print(channel, self.state['channels'][channel])
+
+        await asyncio.gather(*(scrape_shard(shard) for shard in self.pool.shard(channels).values()))
+
     def export_to_csv(self, channel: str):
         conn = self.get_db_connection(channel)
         csv_file = Path(channel) / f'{channel}.csv'
@@ -519,15 +1096,20 @@ class OptimizedTelegramScraper:
             print("No channels saved")
             return
         
+        try:
+            catalog = self.get_catalog()
+        except Exception as e:
+            print(f"Failed to read catalog: {e}")
+            catalog = {}
+
         print("\nCurrent channels:")
         for i, (channel, last_id) in enumerate(self.state['channels'].items(), 1):
-            try:
-                conn = self.get_db_connection(channel)
-                cursor = conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM messages')
-                count = cursor.fetchone()[0]
-                print(f"[{i}] Channel ID: {channel}, Last Message ID: {last_id}, Messages: {count}")
-            except:
+            entry = catalog.get(channel)
+            if entry:
+                media_mb = entry['media_bytes'] / (1024 * 1024)
+                print(f"[{i}] Channel ID: {channel}, Last Message ID: {last_id}, Messages: {entry['message_count']}, "
+                      f"Media: {entry['media_files']}/{entry['media_count']} ({media_mb:.1f} MB)")
+            else:
                 print(f"[{i}] Channel ID: {channel}, Last Message ID: {last_id}")
 
     async def list_channels(self):
@@ -604,16 +1186,34 @@ class OptimizedTelegramScraper:
                 print("Invalid API ID. Must be a number.")
                 return False
 
-        self.client = TelegramClient('session', self.state['api_id'], self.state['api_hash'])
+        for config in self.state.get('sessions') or [{'name': 'session'}]:
+            await self.connect_session(config)
+
+        if not len(self.pool):
+            return False
+
+        self.client = self.pool.members[0].client
+        if len(self.pool) > 1:
+            print(f"✅ {len(self.pool)} sessions ready: {', '.join(m.name for m in self.pool.members)}")
+        return True
+
+    async def connect_session(self, config: Dict[str, Any]) -> bool:
+        name = config['name']
+        # Longer FloodWaits are raised instead of slept inside Telethon, so the limiter and pool see them.
+        client = TelegramClient(name, config.get('api_id') or self.state['api_id'],
+                                config.get('api_hash') or self.state['api_hash'],
+                                flood_sleep_threshold=self.flood_sleep_threshold)
         
         try:
-            await self.client.connect()
+            await client.connect()
         except Exception as e:
-            print(f"Failed to connect: {e}")
+            print(f"Failed to connect session {name}: {e}")
             return False
         
-        if not await self.client.is_user_authorized():
-            print("\n=== Choose Authentication Method ===")
+        # The auth helpers work on self.client.
+        self.client = client
+        if not await client.is_user_authorized():
+            print(f"\n=== Choose Authentication Method ({name}) ===")
             print("[1] QR Code (Recommended - No phone number needed)")
             print("[2] Phone Number (Traditional method)")
             
@@ -627,13 +1227,41 @@ class OptimizedTelegramScraper:
                 
             if not success:
                 print("Authentication failed. Please try again.")
-                await self.client.disconnect()
+                await client.disconnect()
                 return False
         else:
-            print("✅ Already authenticated!")
-            
+            print(f"✅ Already authenticated! ({name})")
+
+        if len(self.pool):
+            # Channels are stored as bare IDs from the primary's dialogs; loading this
+            # account's dialogs caches the access hashes for the ones it has joined.
+            try:
+                await client.get_dialogs()
+            except Exception as e:
+                print(f"Could not load dialogs for session {name}: {e}")
+
+        self.pool.add(name, client)
         return True
 
+    async def add_session(self):
+        name = input("New session name (e.g. session2): ").strip()
+        if not name or any(member.name == name for member in self.pool.members):
+            print("Invalid or duplicate session name")
+            return
+
+        primary = self.client
+        try:
+            if await self.connect_session({'name': name}):
+                self.state.setdefault('sessions', [{'name': 'session'}]).append({'name': name})
+                self.save_state()
+                print(f"✅ Added session {name}; channels are now spread over {len(self.pool)} sessions")
+        finally:
+            self.client = primary
+
+    async def disconnect_clients(self):
+        for client in self.pool.clients() or ([self.client] if self.client else []):
+            await client.disconnect()
+
     def parse_channel_selection(self, choice):
         channels_list = list(self.state['channels'].keys())
         selected_channels = []
@@ -675,9 +1303,7 @@ class OptimizedTelegramScraper:
         
         if selected_channels:
             print(f"\n🚀 Starting scrape of {len(selected_channels)} channel(s)...")
-            for i, channel in enumerate(selected_channels, 1):
-                print(f"\n[{i}/{len(selected_channels)}] Scraping: {channel}")
-                await self.scrape_channel(channel, self.state['channels'][channel])
+            await self.scrape_channels(selected_channels)
             print(f"\n✅ Completed scraping {len(selected_channels)} channel(s)!")
         else:
             print("❌ No valid channels selected")
@@ -688,13 +1314,18 @@ class OptimizedTelegramScraper:
             print("           TELEGRAM SCRAPER")
             print("="*40)
             print("[S] Scrape channels")
+            print("[B] Backfill channels (parallel ranges)")
             print("[C] Continuous scraping")
             print(f"[M] Media scraping: {'ON' if self.state['scrape_media'] else 'OFF'}")
+            print(f"[P] Stream parse downloads: {'ON' if self.state.get('stream_parse') else 'OFF'}")
+            print(f"[Z] Compress text dumps: {'ON' if self.state.get('compress_text') else 'OFF'}")
             print("[L] List & add channels")
             print("[R] Remove channels")
             print("[E] Export data")
             print("[T] Rescrape media")
             print("[F] Fix missing media")
+            print("[D] Disk retention")
+            print(f"[A] Add account session ({len(self.pool)} active)")
             print("[Q] Quit")
             print("="*40)
 
@@ -735,11 +1366,24 @@ class OptimizedTelegramScraper:
                 elif choice == 's':
                     await self.scrape_specific_channels()
                     
+                elif choice == 'b':
+                    await self.backfill_channels()
+                    
                 elif choice == 'm':
                     self.state['scrape_media'] = not self.state['scrape_media']
                     self.save_state()
                     print(f"\n✅ Media scraping {'enabled' if self.state['scrape_media'] else 'disabled'}")
                     
+                elif choice == 'p':
+                    self.state['stream_parse'] = not self.state.get('stream_parse')
+                    self.save_state()
+                    print(f"\n✅ Stream parsing {'enabled' if self.state['stream_parse'] else 'disabled'}")
+                    
+                elif choice == 'z':
+                    self.state['compress_text'] = not self.state.get('compress_text')
+                    self.save_state()
+                    print(f"\n✅ Text dump compression {'enabled' if self.state['compress_text'] else 'disabled'}")
+                    
                 elif choice == 'c':
                     task = asyncio.create_task(self.continuous_scraping())
                     print("Continuous scraping started. Press Ctrl+C to stop.")
@@ -807,16 +1451,13 @@ class OptimizedTelegramScraper:
                         continue
                         
                     await self.view_channels()
-                    print("\nEnter channel NUMBER (1,2,3...) or full channel ID (-100123...)")
+                    print("\nEnter channel NUMBERS (1,2,3...), full channel IDs (-100123...) or all")
                     selection = input("Enter your selection: ").strip()
                     selected_channels = self.parse_channel_selection(selection)
                     
-                    if len(selected_channels) == 1:
-                        channel = selected_channels[0]
-                        print(f"Rescaping media for channel: {channel}")
-                        await self.rescrape_media(channel)
-                    elif len(selected_channels) > 1:
-                        print("Please select only one channel for media rescaping")
+                    if selected_channels:
+                        print(f"Rescraping media for {len(selected_channels)} channel(s)")
+                        await self.rescrape_media(selected_channels)
                     else:
                         print("No valid channel selected")
                     
@@ -826,23 +1467,26 @@ class OptimizedTelegramScraper:
                         continue
                         
                     await self.view_channels()
-                    print("\nEnter channel NUMBER (1,2,3...) or full channel ID (-100123...)")
+                    print("\nEnter channel NUMBERS (1,2,3...), full channel IDs (-100123...) or all")
                     selection = input("Enter your selection: ").strip()
                     selected_channels = self.parse_channel_selection(selection)
                     
-                    if len(selected_channels) == 1:
-                        channel = selected_channels[0]
-                        await self.fix_missing_media(channel)
-                    elif len(selected_channels) > 1:
-                        print("Please select only one channel for fixing missing media")
+                    if selected_channels:
+                        await self.fix_missing_media(selected_channels)
                     else:
                         print("No valid channel selected")
                     
+                elif choice == 'd':
+                    await self.configure_retention()
+                    
+                elif choice == 'a':
+                    await self.add_session()
+                    
                 elif choice == 'q':
                     print("\n👋 Goodbye!")
                     self.close_db_connections()
-                    if self.client:
-                        await self.client.disconnect()
+                    await self.close_stream_resources()
+                    await self.disconnect_clients()
                     sys.exit()
                     
                 else:
@@ -858,8 +1502,8 @@ class OptimizedTelegramScraper:
                 await self.manage_channels()
             finally:
                 self.close_db_connections()
-                if self.client:
-                    await self.client.disconnect()
+                await self.close_stream_resources()
+                await self.disconnect_clients()
         else:
             print("Failed to initialize client. Exiting.")
 
@@ -0,0 +1,109 @@
+import zlib
+
+import pytest
+
+from session_pool import SessionPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(sessions=3):
+    clock = FakeClock()
+    pool = SessionPool(long_flood_wait=60, clock=clock)
+    for i in range(sessions):
+        pool.add(f"session{i}", object())
+    return pool, clock
+
+
+def channels_homed_on(pool, member, count):
+    found = []
+    i = 0
+    while len(found) < count:
+        channel = f"channel{i}"
+        if pool.members[zlib.crc32(channel.encode()) % len(pool)] is member:
+            found.append(channel)
+        i += 1
+    return found
+
+
+def test_home_assignment_is_stable():
+    pool, _ = make_pool()
+    channels = [f"channel{i}" for i in range(20)]
+    first = {channel: pool.member_for(channel).name for channel in channels}
+
+    other, _ = make_pool()
+    assert {channel: other.member_for(channel).name for channel in channels} == first
+    assert {channel: pool.member_for(channel).name for channel in channels} == first
+    assert len(set(first.values())) > 1
+
+
+def test_long_flood_wait_benches_session_until_it_expires():
+    pool, clock = make_pool()
+    member = pool.members[0]
+
+    assert pool.report_flood_wait(member.client, 30) is False
+    assert member in pool.available()
+
+    assert pool.report_flood_wait(member.client, 120) is True
+    assert member not in pool.available()
+
+    clock.now += 121
+    assert member in pool.available()
+
+
+def test_single_session_pool_does_not_fail_over():
+    pool, _ = make_pool(sessions=1)
+    member = pool.members[0]
+
+    assert pool.report_flood_wait(member.client, 120) is False
+    assert pool.member_for("channel0") is member
+
+
+def test_failover_goes_to_least_loaded_session():
+    pool, clock = make_pool()
+    benched, busy, idle = pool.members
+
+    for channel in channels_homed_on(pool, busy, 2):
+        assert pool.member_for(channel) is busy
+    assert pool.member_for(channels_homed_on(pool, idle, 1)[0]) is idle
+    channel = channels_homed_on(pool, benched, 1)[0]
+    assert pool.member_for(channel) is benched
+
+    pool.report_flood_wait(benched.client, 300)
+    assert pool.member_for(channel) is idle
+    assert pool.client_for(channel) is idle.client
+
+    # The channel stays on its failover session rather than bouncing back.
+    clock.now += 301
+    assert pool.member_for(channel) is idle
+
+
+def test_unreachable_channel_moves_to_a_session_that_can_access_it():
+    pool, _ = make_pool()
+    home, other, third = pool.members
+    channel = channels_homed_on(pool, home, 1)[0]
+    assert pool.member_for(channel) is home
+
+    pool.mark_unreachable(home, channel)
+    assert pool.member_for(channel) in (other, third)
+
+    pool.mark_unreachable(other, channel)
+    pool.mark_unreachable(third, channel)
+    with pytest.raises(RuntimeError):
+        pool.member_for(channel)
+
+
+def test_flood_wait_only_fails_over_to_sessions_that_can_access_the_channel():
+    pool, _ = make_pool(sessions=2)
+    home, other = pool.members
+    channel = channels_homed_on(pool, home, 1)[0]
+    pool.mark_unreachable(other, channel)
+
+    assert pool.report_flood_wait(home.client, 120, channel) is False
+    assert pool.member_for(channel) is home